@@ -1,115 +1,330 @@
-def process_experiment(df_full, experiment, protease='trypsin', max_missed_cleavages=2, min_values_for_cv=3):
-    """Process a single experiment"""
-    # Filter
-    mask = create_combined_mask(df_full, experiment['file_tags'])
-    _df = df_full[mask]
-    
-    # Calculate CV statistics - FILTER FOR SUFFICIENT REPLICATES
-    # For Protein Groups
-    _df_pg_cv_temp = _df.groupby('Protein.Group')['PG.MaxLFQ'].agg(['mean', 'std', 'count'])
-    # Only keep protein groups with sufficient values for CV calculation
-    _df_pg_cv = _df_pg_cv_temp[_df_pg_cv_temp['count'] >= min_values_for_cv].copy()
-    _df_pg_cv['cv'] = _df_pg_cv['std'] / _df_pg_cv['mean']
-    
-    # For Precursors
-    _df_pr_cv_temp = _df.groupby('Precursor.Id')['Precursor.Normalised'].agg(['mean', 'std', 'count'])
-    # Only keep precursors with sufficient values for CV calculation
-    _df_pr_cv = _df_pr_cv_temp[_df_pr_cv_temp['count'] >= min_values_for_cv].copy()
-    _df_pr_cv['cv'] = _df_pr_cv['std'] / _df_pr_cv['mean']
-    
-    # Calculate missed cleavages PER RUN
-    def calculate_mc_per_run(group):
-        """Calculate missed cleavage distribution for a single run"""
-        # Get unique peptides (drop duplicates, keep first occurrence)
-        unique_peptides = group['Stripped.Sequence'].drop_duplicates(keep='first')
-        
-        mc_counts = {}
-        
-        for seq in unique_peptides:
-            mc = count_missed_cleavages(seq, protease)
-            mc_capped = min(mc, max_missed_cleavages)
-            mc_counts[mc_capped] = mc_counts.get(mc_capped, 0) + 1
-        
-        total = len(unique_peptides)
-        
-        # Create result dict with relative proportions
-        result = {}
-        for i in range(max_missed_cleavages + 1):
-            count = mc_counts.get(i, 0)
-            result[f'MC{i}'] = count / total if total > 0 else 0
-        
-        return pd.Series(result)
-    
-    # Apply per run
-    mc_per_run = _df.groupby('Run').apply(calculate_mc_per_run).reset_index()
-    
-    # Aggregate per Run
-    _df_agg = _df.groupby('Run', as_index=False).agg({
-        'Modified.Sequence': 'nunique',
-        'Precursor.Id': 'nunique',
-        'Protein.Group': 'nunique',
-        'Precursor.Quantity': 'sum'  # ADD SUM OF NORMALIZED INTENSITIES
-    }).rename(columns={
-        'Modified.Sequence': 'peptide',
-        'Precursor.Id': 'precursor',
-        'Protein.Group': 'protein',
-        'Precursor.Quantity': 'total_intensity'  # OR CHOOSE YOUR PREFERRED NAME
+import os
+import numpy as np
+import pandas as pd
+import weakref
+from bisect import bisect_left
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# Columns of df_full read by process_all_experiments
+_AGGREGATED_COLUMNS = ['Run', 'PG.MaxLFQ', 'Precursor.Normalised', 'Precursor.Id', 'Protein.Group',
+                       'Stripped.Sequence', 'Modified.Sequence', 'Precursor.Quantity']
+
+# Results of process_experiment(..., use_cache=True) per DataFrame:
+# id(df_full) -> (weakref, {key: result}). Entries are keyed on the frame object
+# and experiment settings only, NOT its contents: after editing df_full in place
+# (e.g. df_full.loc[:, 'PG.MaxLFQ'] = ...) a cached call returns the old result.
+_experiment_cache = {}
+
+def process_experiment(df_full, experiment, protease='trypsin', max_missed_cleavages=2, min_values_for_cv=3,
+                       use_cache=False):
+    """
+    Process a single experiment.
+    
+    With use_cache=True, results are cached per df_full object and experiment
+    settings, and repeated calls return a copy of the stored result. Only use it
+    if df_full is not modified in place between calls; the cache does not see
+    such edits and would return stale results.
+    """
+    if not use_cache:
+        return process_all_experiments(df_full, [experiment], protease,
+                                       max_missed_cleavages, min_values_for_cv)[0]
+    
+    entry = _experiment_cache.get(id(df_full))
+    if entry is None or entry[0]() is not df_full:
+        # Drop the entry once df_full is garbage collected, since ids are reused
+        entry = (weakref.ref(df_full), {})
+        _experiment_cache[id(df_full)] = entry
+        weakref.finalize(df_full, _experiment_cache.pop, id(df_full), None)
+    
+    # A single tag is one suffix, as in create_combined_mask, not its characters
+    tags = experiment['file_tags']
+    tags = (tags,) if isinstance(tags, str) else tuple(tags)
+    key = (tags, experiment['instrument'], experiment['method'],
+           protease, max_missed_cleavages, min_values_for_cv)
+    if key not in entry[1]:
+        entry[1][key] = process_all_experiments(df_full, [experiment], protease,
+                                                max_missed_cleavages, min_values_for_cv)[0]
+    
+    return entry[1][key].copy()
+
+def process_all_experiments(df_full, experiments, protease='trypsin', max_missed_cleavages=2, min_values_for_cv=3,
+                            n_jobs=1):
+    """
+    Process several experiments from the same DataFrame in a single pass.
+    
+    Rows of all experiments are gathered once and every statistic is computed
+    grouped by (experiment, Run) or (experiment, ID) instead of once per
+    experiment. Experiments may share runs.
+    
+    With n_jobs > 1 the independent steps of that single pass (factorizing each
+    ID column, each CV and count statistic) run in up to n_jobs threads. The
+    rows are still gathered and factorized once, and the result is identical
+    to n_jobs=1.
+    
+    Args:
+        df_full (pandas.DataFrame): Precursor table, e.g. from load_parquet_cached
+        experiments (list): Experiment dicts with 'file_tags', 'instrument' and 'method'
+        protease (str): Protease specificity, see count_missed_cleavages
+        max_missed_cleavages (int): Missed cleavage counts above this are capped
+        min_values_for_cv (int): Minimum number of values for a CV to be counted
+        n_jobs (int): Number of threads, -1 for one per CPU core
+    
+    Returns:
+        list: One aggregated DataFrame per experiment, same as process_experiment
+    """
+    n_exp = len(experiments)
+    
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    
+    # Filter: stack the rows of every experiment, tagged with its position
+    masks = [create_combined_mask(df_full, experiment['file_tags']).to_numpy() for experiment in experiments]
+    rows = [np.flatnonzero(mask) for mask in masks]
+    exp_ids = np.repeat(np.arange(n_exp), [len(r) for r in rows])
+    # Only gather the columns used below, in one take over rows and columns
+    columns = [df_full.columns.get_loc(col) for col in _AGGREGATED_COLUMNS]
+    _df = df_full.iloc[np.concatenate(rows) if rows else [], columns]
+    
+    # Factorize each ID column once; per-run and total counts reuse the codes
+    factorized = _run_tasks({
+        'Run': lambda: pd.factorize(_df['Run'], sort=True),  # sorted, like groupby
+        'Stripped.Sequence': lambda: pd.factorize(_df['Stripped.Sequence']),
+        'Modified.Sequence': lambda: pd.factorize(_df['Modified.Sequence']),
+        'Precursor.Id': lambda: pd.factorize(_df['Precursor.Id']),
+        'Protein.Group': lambda: pd.factorize(_df['Protein.Group']),
+    }, n_jobs)
+    run_codes, runs = factorized['Run']
+    seq_codes, sequences = factorized['Stripped.Sequence']
+    mod_codes, mod_sequences = factorized['Modified.Sequence']
+    pr_codes, precursors = factorized['Precursor.Id']
+    pg_codes, protein_groups = factorized['Protein.Group']
+    
+    # (experiment, Run) groups, ordered by experiment and then run
+    n_groups = n_exp * len(runs)
+    run_group = _combine_codes(exp_ids, run_codes, len(runs))
+    has_run = run_group >= 0
+    quantity = _df['Precursor.Quantity'].to_numpy(dtype=float)
+    
+    stats = _run_tasks({
+        # Calculate CV statistics - FILTER FOR SUFFICIENT REPLICATES
+        # Protein groups and precursors, only those with sufficient values for CV calculation
+        'pg_cv': lambda: _cv_per_group(_combine_codes(exp_ids, pg_codes, len(protein_groups)),
+                                       n_exp * len(protein_groups), _df['PG.MaxLFQ'], min_values_for_cv),
+        'pr_cv': lambda: _cv_per_group(_combine_codes(exp_ids, pr_codes, len(precursors)),
+                                       n_exp * len(precursors), _df['Precursor.Normalised'], min_values_for_cv),
+        # Calculate missed cleavages PER RUN
+        'mc': lambda: calculate_mc_per_run(run_group, n_groups, seq_codes, sequences,
+                                           protease=protease, max_missed_cleavages=max_missed_cleavages),
+        # Aggregate per Run
+        'peptide': lambda: _nunique_per_group(run_group, n_groups, mod_codes, len(mod_sequences)),
+        'precursor': lambda: _nunique_per_group(run_group, n_groups, pr_codes, len(precursors)),
+        'protein': lambda: _nunique_per_group(run_group, n_groups, pg_codes, len(protein_groups)),
+        # Sum of intensities, missing values count as 0 like pandas sum
+        'total_intensity': lambda: np.bincount(run_group[has_run],
+                                               weights=np.nan_to_num(quantity[has_run]),
+                                               minlength=n_groups).astype(float),
+        # Totals per experiment
+        'total_peptides': lambda: _nunique_per_group(exp_ids, n_exp, seq_codes, len(sequences)),
+        'total_protein_groups': lambda: _nunique_per_group(exp_ids, n_exp, pg_codes, len(protein_groups)),
+        'total_precursors': lambda: _nunique_per_group(exp_ids, n_exp, pr_codes, len(precursors)),
+    }, n_jobs)
+    
+    pg_groups, pg_cv = stats['pg_cv']
+    pg20 = np.bincount(pg_groups[pg_cv < 0.2] // max(len(protein_groups), 1), minlength=n_exp)
+    pr_groups, pr_cv = stats['pr_cv']
+    pr20 = np.bincount(pr_groups[pr_cv < 0.2] // max(len(precursors), 1), minlength=n_exp)
+    n_mc = max_missed_cleavages + 1
+    mc_per_run, avg_mc = stats['mc']
+    total_peptides = stats['total_peptides']
+    total_protein_groups = stats['total_protein_groups']
+    total_precursors = stats['total_precursors']
+    
+    agg = pd.DataFrame({
+        # Fixed dtypes, so an experiment without rows has the same schema
+        'Run': pd.Series(np.tile(np.asarray(runs, dtype=object), n_exp), dtype=str),
+        'peptide': stats['peptide'],
+        'precursor': stats['precursor'],
+        'protein': stats['protein'],
+        'total_intensity': stats['total_intensity']
     })
     
-    # Merge missed cleavage data
-    _df_agg = _df_agg.merge(mc_per_run, on='Run', how='left')
+    # Merge missed cleavage data (both tables are indexed by group code)
+    for i in range(n_mc):
+        agg[f'MC{i}'] = mc_per_run[:, i]
     
     # Calculate average missed cleavages (weighted average)
-    avg_mc = 0
-    for i in range(max_missed_cleavages + 1):
-        avg_mc += _df_agg[f'MC{i}'] * i
-    _df_agg['avg_MC'] = avg_mc
-    
-    # Add statistics
-    _df_agg = _df_agg.assign(
-        PG20=(_df_pg_cv['cv'] < 0.2).sum(),
-        Pr20=(_df_pr_cv['cv'] < 0.2).sum(),
-        total_peptides=_df['Stripped.Sequence'].nunique(),
-        total_protein_groups=_df['Protein.Group'].nunique(),
-        total_precursors=_df['Precursor.Id'].nunique(),
-        instrument=experiment['instrument'],
-        method=experiment['method']
-    )
-    
-    return _df_agg
-
-def calculate_mc_per_run(group):
-        """Calculate missed cleavage distribution for a single run"""
-        # Get unique peptides (drop duplicates, keep first occurrence)
-        unique_peptides = group['Stripped.Sequence'].drop_duplicates(keep='first')
-        
-        mc_counts = {}
-        
-        for seq in unique_peptides:
-            mc = count_missed_cleavages(seq, protease)
-            mc_capped = min(mc, max_missed_cleavages)
-            mc_counts[mc_capped] = mc_counts.get(mc_capped, 0) + 1
-        
-        total = len(unique_peptides)
-        
-        # Create result dict with relative proportions
-        result = {}
-        for i in range(max_missed_cleavages + 1):
-            count = mc_counts.get(i, 0)
-            result[f'MC{i}'] = count / total if total > 0 else 0
+    agg['avg_MC'] = avg_mc
+    
+    # Split by experiment, keeping only runs that have rows in it
+    present = np.bincount(run_group[has_run], minlength=n_groups) > 0
+    results = []
+    for e, experiment in enumerate(experiments):
+        in_exp = present[e * len(runs):(e + 1) * len(runs)]
+        _df_agg = agg.iloc[e * len(runs):(e + 1) * len(runs)][in_exp].reset_index(drop=True)
         
-        return pd.Series(result)
+        # Add statistics
+        _df_agg = _df_agg.assign(
+            PG20=int(pg20[e]),
+            Pr20=int(pr20[e]),
+            total_peptides=int(total_peptides[e]),
+            total_protein_groups=int(total_protein_groups[e]),
+            total_precursors=int(total_precursors[e]),
+            instrument=experiment['instrument'],
+            method=experiment['method']
+        )
+        results.append(_df_agg)
+    
+    return results
 
-import pandas as pd
-import re
-from functools import lru_cache
-from collections import defaultdict
-@lru_cache(maxsize=None)
+def _run_tasks(tasks, n_jobs):
+    """
+    Call each zero-argument function in tasks, in up to n_jobs threads if n_jobs > 1.
+    
+    Returns:
+        dict: Result of each task, under the same name
+    """
+    if n_jobs > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            futures = {name: executor.submit(task) for name, task in tasks.items()}
+            return {name: future.result() for name, future in futures.items()}
+    return {name: task() for name, task in tasks.items()}
+
+def calculate_mc_per_run(group_codes, n_groups, seq_codes, sequences, protease='trypsin', max_missed_cleavages=2):
+    """
+    Calculate the missed cleavage distribution for each run.
+    
+    Args:
+        group_codes (numpy.ndarray): Integer run (group) code per row, -1 for missing
+        n_groups (int): Number of runs (groups)
+        seq_codes (numpy.ndarray): Integer Stripped.Sequence code per row, -1 for missing
+        sequences (list-like): Distinct sequences, indexed by seq_codes
+        protease (str): Protease specificity, see count_missed_cleavages
+        max_missed_cleavages (int): Missed cleavage counts above this are capped
+    
+    Returns:
+        tuple: (n_groups, max_missed_cleavages + 1) relative proportions of unique
+        peptides with 0, 1, ... missed cleavages in each run, and the average
+        (capped) number of missed cleavages per run
+    """
+    # Unique peptides per run; missed cleavages are counted once per sequence
+    group_idx, seq_idx = _unique_pairs(group_codes, seq_codes, len(sequences))
+    mc = _count_missed_cleavages_array(sequences, protease)
+    mc_capped = np.minimum(mc[seq_idx], max_missed_cleavages)
+    
+    # Relative proportions of each missed cleavage count per run
+    n_mc = max_missed_cleavages + 1
+    mc_counts = np.bincount(group_idx * n_mc + mc_capped, minlength=n_groups * n_mc).reshape(n_groups, n_mc)
+    total = mc_counts.sum(axis=1)
+    mc_per_run = np.divide(mc_counts, total[:, None], out=np.zeros(mc_counts.shape), where=total[:, None] > 0)
+    
+    # Average missed cleavages is the mean capped count of each run's peptides
+    mc_sum = np.bincount(group_idx, weights=mc_capped, minlength=n_groups)
+    avg_mc = np.divide(mc_sum, total, out=np.zeros(n_groups), where=total > 0)
+    
+    return mc_per_run, avg_mc
+
+# Columns read from DIA-NN report parquet files
+_PARQUET_COLUMNS = ['Run', 'PG.Q.Value', 'PG.MaxLFQ',
+                    'Precursor.Normalised', 'Precursor.Id',
+                    'Protein.Group', 'Stripped.Sequence', 'Modified.Sequence', 'Genes', 'Precursor.Quantity']
+# ID columns stored as categoricals so later grouping works on integer codes
+_CATEGORICAL_COLUMNS = ['Run', 'Protein.Group', 'Precursor.Id', 'Stripped.Sequence', 'Modified.Sequence', 'Genes']
+
+# Decoded frames are large, so only keep the most recently used few
+@lru_cache(maxsize=4)
 def load_parquet_cached(path):
-    df = pd.read_parquet(path, 
-                        columns=['Run', 'PG.Q.Value', 'PG.MaxLFQ', 
-                                'Precursor.Normalised', 'Precursor.Id',
-                                'Protein.Group', 'Stripped.Sequence','Modified.Sequence','Genes','Precursor.Quantity'])
+    df = pd.read_parquet(path, columns=_PARQUET_COLUMNS)
+    for col in _CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype('category')
+    return df
+
+def _file_version(path):
+    """(path, mtime, size) key, so caches miss once a file is rewritten in place"""
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+@lru_cache(maxsize=32)
+def _parquet_metadata(path, mtime_ns, size):
+    """Parquet footer metadata; the file is closed again right after reading it"""
+    with pq.ParquetFile(path) as parquet_file:
+        return parquet_file.metadata
+
+@lru_cache(maxsize=32)
+def _parquet_runs(path, mtime_ns, size):
+    """Distinct Run names in a parquet file, read from the Run column only"""
+    with pq.ParquetFile(path, metadata=_parquet_metadata(path, mtime_ns, size)) as parquet_file:
+        runs = pc.unique(parquet_file.read(columns=['Run'])['Run'])
+    return tuple(run for run in runs.to_pylist() if run is not None)
+
+def _row_groups_with_runs(parquet_file, runs):
+    """
+    Indices of the row groups whose Run min/max statistics may contain any of runs.
+    Row groups without statistics are always kept.
+    """
+    runs = sorted(runs)
+    run_column = parquet_file.schema_arrow.get_field_index('Run')
+    
+    row_groups = []
+    for i in range(parquet_file.metadata.num_row_groups):
+        stats = parquet_file.metadata.row_group(i).column(run_column).statistics
+        if stats is None or not stats.has_min_max:
+            row_groups.append(i)
+            continue
+        # First wanted run >= min must also be <= max
+        first = bisect_left(runs, stats.min)
+        if first < len(runs) and runs[first] <= stats.max:
+            row_groups.append(i)
+    return row_groups
+
+def load_experiment_rows(path, run_tags, batch_size=65536):
+    """
+    Read only the rows of runs ending with specific tag(s) from a parquet file.
+    
+    Row groups whose Run statistics exclude all matching runs are never read,
+    the remaining ones are streamed in batches and only matching rows are kept,
+    so the full file is never decoded at once. Only the file metadata and run
+    names are cached between calls, keyed on the file's modification time and
+    size, and the file is closed again afterwards. Columns and dtypes are the
+    same as load_parquet_cached.
+    
+    Args:
+        path (str): Path to the parquet file
+        run_tags (str or list): Single tag or list of tags the Run must end with
+        batch_size (int): Maximum number of rows decoded at a time
+    
+    Returns:
+        pandas.DataFrame: Rows of the matching runs
+    """
+    if isinstance(run_tags, str):
+        run_tags = [run_tags]
+    
+    version = _file_version(path)
+    with pq.ParquetFile(path, metadata=_parquet_metadata(*version)) as parquet_file:
+        schema = pa.schema([parquet_file.schema_arrow.field(col) for col in _PARQUET_COLUMNS])
+        wanted_runs = [run for run in _parquet_runs(*version) if run.endswith(tuple(run_tags))]
+        # Files written from categorical frames store Run dictionary-encoded;
+        # is_in matches those against a value set of the dictionary's value type
+        run_type = schema.field('Run').type
+        if pa.types.is_dictionary(run_type):
+            run_type = run_type.value_type
+        value_set = pa.array(wanted_runs, type=run_type)
+        
+        batches = []
+        row_groups = _row_groups_with_runs(parquet_file, wanted_runs)
+        if row_groups:
+            for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups,
+                                                   columns=_PARQUET_COLUMNS):
+                batch = batch.filter(pc.is_in(batch.column('Run'), value_set=value_set))
+                if batch.num_rows:
+                    batches.append(batch)
+    
+    df = pa.Table.from_batches(batches, schema=schema).to_pandas()
+    for col in _CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype('category')
     return df
 
 
@@ -133,7 +348,12 @@ def generate_pattern_list(prefixes, start, end, prefix_all=''):
     if isinstance(prefixes, str):
         prefixes = [prefixes]
     
-    return [f"{prefix_all}{prefix}{i}" for prefix in prefixes for i in range(start, end + 1)]
+    # Build all prefix/number combinations as one string array broadcast
+    prefixes = np.asarray(prefixes, dtype=str)
+    numbers = np.arange(start, end + 1).astype(str)
+    patterns = np.char.add(np.repeat(prefixes, len(numbers)), np.tile(numbers, len(prefixes)))
+    
+    return np.char.add(prefix_all, patterns).tolist()
 
 def create_combined_mask(df, tags, column='Run'):
     """
@@ -152,18 +372,40 @@ def create_combined_mask(df, tags, column='Run'):
         'A1' matches: 'Sample_A1', 'Test_A1'
         'A1' does NOT match: 'Sample_A10', 'A1_test', 'TestA10'
     """
-    import pandas as pd
-    
     # Convert single tag to list
     if isinstance(tags, str):
         tags = [tags]
     
     # Check if column ends with any of the tags
     # This is MUCH faster than regex
-    mask = df[column].str.endswith(tuple(tags), na=False)
+    if isinstance(df[column].dtype, pd.CategoricalDtype):
+        # Only check the unique categories, then compare integer codes per row
+        categories = df[column].cat.categories
+        matching_codes = np.flatnonzero(categories.str.endswith(tuple(tags)))
+        mask = pd.Series(np.isin(df[column].cat.codes.to_numpy(), matching_codes), index=df.index)
+    else:
+        mask = df[column].str.endswith(tuple(tags), na=False)
     
     return mask
 
+# Cleavage sites for different proteases
+_CLEAVAGE_SITES = {
+    'trypsin': 'RK',
+    'lysc': 'K',
+    'argc': 'R',
+    'chymotrypsin': 'FWY',
+    'gluc': 'ED'  # Glu-C
+}
+
+def _build_site_lut(sites):
+    """256-entry byte lookup table, 1 for cleavage residues and 0 otherwise"""
+    lut = np.zeros(256, dtype=np.uint8)
+    lut[list(sites.encode('ascii'))] = 1
+    return lut
+
+_SITE_LUT = {protease: _build_site_lut(sites) for protease, sites in _CLEAVAGE_SITES.items()}
+
+@lru_cache(maxsize=1_000_000)
 def count_missed_cleavages(sequence, protease='trypsin'):
     """
     Count missed cleavages in a peptide sequence.
@@ -183,19 +425,119 @@ def count_missed_cleavages(sequence, protease='trypsin'):
     if not sequence or len(sequence) == 0:
         return 0
     
-    # Define cleavage sites for different proteases
-    cleavage_sites = {
-        'trypsin': 'RK',
-        'lysc': 'K',
-        'argc': 'R',
-        'chymotrypsin': 'FWY',
-        'gluc': 'ED'  # Glu-C
-    }
-    
-    sites = cleavage_sites.get(protease.lower(), 'RK')
+    sites = _CLEAVAGE_SITES.get(protease.lower(), 'RK')
     
     # Count cleavage sites within the sequence
     # Exclude the last residue (that's where cleavage occurred)
-    missed = sum(1 for aa in sequence[:-1] if aa in sites)
+    body = sequence[:-1]
+    missed = sum(body.count(aa) for aa in sites)
+    
+    return missed
+
+def _count_missed_cleavages_array(sequences, protease='trypsin'):
+    """
+    Count missed cleavages for many peptide sequences at once.
+    
+    Args:
+        sequences (list-like): Peptide sequences (stripped, no modifications)
+        protease (str): Protease specificity, see count_missed_cleavages
+    
+    Returns:
+        numpy.ndarray: Number of missed cleavages per sequence
+    """
+    lut = _SITE_LUT.get(protease.lower(), _SITE_LUT['trypsin'])
+    sequences = list(sequences)
+    
+    # All sequences back to back in one byte buffer, delimited by offsets
+    lengths = np.fromiter(map(len, sequences), dtype=np.int64, count=len(sequences))
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    hits = lut[np.frombuffer(''.join(sequences).encode('ascii'), dtype=np.uint8)]
+    
+    # Running hit count; each sequence's count is a difference of two entries,
+    # excluding the last residue (that's where cleavage occurred)
+    cum_hits = np.concatenate(([0], np.cumsum(hits, dtype=np.int64)))
+    
+    return cum_hits[np.maximum(ends - 1, starts)] - cum_hits[starts]
+
+def _unique_pairs(group_codes, value_codes, n_values):
+    """
+    Find the distinct (group, value) combinations of two factorized columns.
+    
+    Args:
+        group_codes (numpy.ndarray): Integer group code per row, -1 for missing
+        value_codes (numpy.ndarray): Integer value code per row, -1 for missing
+        n_values (int): Number of distinct values
+    
+    Returns:
+        tuple: Group codes and value codes of each distinct pair
+    """
+    valid = (group_codes >= 0) & (value_codes >= 0)
+    
+    # Encode each (group, value) pair as one integer and keep distinct pairs
+    pairs = group_codes[valid].astype(np.int64) * n_values + value_codes[valid]
+    pairs = pd.unique(pairs)
+    
+    return np.divmod(pairs, max(n_values, 1))
+
+def _combine_codes(outer_codes, inner_codes, n_inner):
+    """
+    Combine two factorized columns into one code per (outer, inner) pair.
+    
+    Args:
+        outer_codes (numpy.ndarray): Integer outer code per row, -1 for missing
+        inner_codes (numpy.ndarray): Integer inner code per row, -1 for missing
+        n_inner (int): Number of distinct inner values
+    
+    Returns:
+        numpy.ndarray: outer * n_inner + inner per row, -1 if either is missing
+    """
+    valid = (outer_codes >= 0) & (inner_codes >= 0)
+    
+    return np.where(valid, outer_codes.astype(np.int64) * n_inner + inner_codes, -1)
+
+def _nunique_per_group(group_codes, n_groups, value_codes, n_values):
+    """
+    Count distinct non-missing values per group without a pandas groupby.
+    
+    Args:
+        group_codes (numpy.ndarray): Integer group code per row, -1 for missing
+        n_groups (int): Number of groups
+        value_codes (numpy.ndarray): Integer value code per row, -1 for missing
+        n_values (int): Number of distinct values
+    
+    Returns:
+        numpy.ndarray: Number of distinct values for each group code
+    """
+    group_idx, _ = _unique_pairs(group_codes, value_codes, n_values)
+    
+    return np.bincount(group_idx, minlength=n_groups)
+
+def _cv_per_group(group_codes, n_groups, values, min_values=1):
+    """
+    Coefficient of variation (sample std / mean) per group without a pandas groupby.
+    
+    Args:
+        group_codes (numpy.ndarray): Integer group code per row, -1 for missing
+        n_groups (int): Number of groups
+        values (pandas.Series): Values to summarise, missing values are skipped
+        min_values (int): Groups with fewer non-missing values are left out
+    
+    Returns:
+        tuple: Codes of the groups with at least min_values values, and their CV
+    """
+    values = values.to_numpy(dtype=float)
+    valid = (group_codes >= 0) & ~np.isnan(values)
+    codes, values = group_codes[valid], values[valid]
+    
+    count = np.bincount(codes, minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.bincount(codes, weights=values, minlength=n_groups) / count
+        # Sum squared deviations from the group mean rather than using
+        # sum(x**2) - sum(x)**2 / n, which cancels badly for large intensities
+        sq_dev = np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=n_groups)
+        
+        groups = np.flatnonzero(count >= min_values)
+        cv = np.sqrt(sq_dev[groups] / (count[groups] - 1)) / mean[groups]
     
-    return missed
\ No newline at end of file
+    return groups, cv
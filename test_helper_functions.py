@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+import helper_functions as cf
+
+
+def make_report(n_runs=6, rows_per_run=500):
+    """Small DIA-NN-like report with runs E178_A1 ... E178_A<n_runs>"""
+    n = n_runs * rows_per_run
+    peptides = ['PEPTIDEK', 'AKDLR', 'LLKSSVR', 'GGRK']
+    return pd.DataFrame({
+        'Run': [f'Sample_E178_A{i % n_runs + 1}' for i in range(n)],
+        'PG.Q.Value': [0.001] * n,
+        'PG.MaxLFQ': [1000.0 + i % 7 for i in range(n)],
+        'Precursor.Normalised': [500.0 + i % 5 for i in range(n)],
+        'Precursor.Id': [f'{peptides[i % 4]}{i % 3}' for i in range(n)],
+        'Protein.Group': [f'P{i % 11}' for i in range(n)],
+        'Stripped.Sequence': [peptides[i % 4] for i in range(n)],
+        'Modified.Sequence': [peptides[i % 4] for i in range(n)],
+        'Genes': [f'G{i % 11}' for i in range(n)],
+        'Precursor.Quantity': [100.0 + i % 13 for i in range(n)],
+    })
+
+
+def test_load_experiment_rows_dictionary_encoded_run(tmp_path):
+    # Frames written from categoricals store Run as a dictionary column
+    report = make_report().astype({col: 'category' for col in cf._CATEGORICAL_COLUMNS})
+    path = tmp_path / 'report.parquet'
+    report.to_parquet(path, row_group_size=700)
+
+    rows = cf.load_experiment_rows(str(path), ['E178_A1', 'E178_A2'])
+
+    assert sorted(rows['Run'].unique()) == ['Sample_E178_A1', 'Sample_E178_A2']
+    assert len(rows) == report['Run'].isin(['Sample_E178_A1', 'Sample_E178_A2']).sum()
+    assert len(cf.load_experiment_rows(str(path), 'E178_A9')) == 0
+
+
+def test_load_experiment_rows_rewritten_file(tmp_path):
+    # A report regenerated at the same path must not reuse cached metadata
+    path = tmp_path / 'report.parquet'
+    make_report(n_runs=2).to_parquet(path, row_group_size=300)
+    assert len(cf.load_experiment_rows(str(path), 'E178_A4')) == 0
+
+    make_report(n_runs=4, rows_per_run=300).to_parquet(path, row_group_size=300)
+    rows = cf.load_experiment_rows(str(path), 'E178_A4')
+
+    assert len(rows) == 300
+    assert set(rows['Run']) == {'Sample_E178_A4'}
+
+
+def test_process_experiment_cache_returns_equal_independent_copies():
+    df_full = make_report()
+    experiment = {'instrument': 'i', 'method': 'm', 'file_tags': ['E178_A1', 'E178_A2']}
+    first = cf.process_experiment(df_full, experiment, use_cache=True)
+    expected = first.copy()
+
+    # Changing a returned frame must not leak into later cached results
+    first.loc[:, 'total_intensity'] = -1.0
+    again = cf.process_experiment(df_full, experiment, use_cache=True)
+
+    assert again.equals(expected)
+    assert again.equals(cf.process_experiment(df_full, experiment))
+
+
+def test_process_experiment_cache_str_tags_do_not_collide():
+    df_full = make_report(n_runs=12)
+    as_str = {'instrument': 'i', 'method': 'm', 'file_tags': 'A1'}
+    as_chars = {'instrument': 'i', 'method': 'm', 'file_tags': ['A', '1']}
+
+    cached_str = cf.process_experiment(df_full, as_str, use_cache=True)
+    cached_chars = cf.process_experiment(df_full, as_chars, use_cache=True)
+
+    assert list(cached_str['Run']) == ['Sample_E178_A1']
+    assert list(cached_chars['Run']) == ['Sample_E178_A1', 'Sample_E178_A11']
+    assert cached_chars.equals(cf.process_experiment(df_full, as_chars))
+
+
+def make_random_report(seed=0, n=6000):
+    """make_report() with varied sequences, intensities around CV 0.2 and NaNs"""
+    rng = np.random.default_rng(seed)
+    report = make_report(n_runs=6, rows_per_run=n // 6)
+    residues = np.array(list('ACDEGKLPRSTVKR'))
+    peptides = [''.join(rng.choice(residues, rng.integers(4, 16))) + 'K' for _ in range(300)]
+    peptide = rng.integers(0, len(peptides), n)
+    report['Stripped.Sequence'] = [peptides[i] for i in peptide]
+    report['Modified.Sequence'] = [peptides[i] + ('(ox)' if ox else '') for i, ox in
+                                   zip(peptide, rng.random(n) < 0.3)]
+    report['Precursor.Id'] = [peptides[i] + str(c) for i, c in zip(peptide, rng.integers(1, 3, n))]
+    report['Protein.Group'] = [f'P{i % 60}' for i in peptide]
+    for col in ['PG.MaxLFQ', 'Precursor.Normalised', 'Precursor.Quantity']:
+        values = rng.lognormal(10, 0.2, n)
+        values[rng.random(n) < 0.1] = np.nan
+        report[col] = values
+    return report
+
+
+def reference_experiment(df_full, experiment, protease, max_missed_cleavages, min_values_for_cv):
+    """Plain pandas groupby version of process_experiment, as it was first written"""
+    _df = df_full[df_full['Run'].str.endswith(tuple(experiment['file_tags']))]
+
+    cv = {}
+    for key, col in [('PG20', 'PG.MaxLFQ'), ('Pr20', 'Precursor.Normalised')]:
+        stats = _df.groupby('Protein.Group' if key == 'PG20' else 'Precursor.Id')[col].agg(['mean', 'std', 'count'])
+        stats = stats[stats['count'] >= min_values_for_cv]
+        cv[key] = int((stats['std'] / stats['mean'] < 0.2).sum())
+
+    def mc_per_run(group):
+        mc = group['Stripped.Sequence'].drop_duplicates().map(
+            lambda seq: min(cf.count_missed_cleavages(seq, protease), max_missed_cleavages))
+        counts = mc.value_counts(normalize=True)
+        return pd.Series({f'MC{i}': counts.get(i, 0.0) for i in range(max_missed_cleavages + 1)})
+
+    agg = _df.groupby('Run', as_index=False).agg(
+        peptide=('Modified.Sequence', 'nunique'),
+        precursor=('Precursor.Id', 'nunique'),
+        protein=('Protein.Group', 'nunique'),
+        total_intensity=('Precursor.Quantity', 'sum'))
+    mc = pd.DataFrame([mc_per_run(group) for _, group in _df.groupby('Run')]).reset_index(drop=True)
+    agg = pd.concat([agg, mc], axis=1)
+    agg['avg_MC'] = sum(agg[f'MC{i}'] * i for i in range(max_missed_cleavages + 1))
+    return agg.assign(
+        **cv,
+        total_peptides=_df['Stripped.Sequence'].nunique(),
+        total_protein_groups=_df['Protein.Group'].nunique(),
+        total_precursors=_df['Precursor.Id'].nunique(),
+        instrument=experiment['instrument'],
+        method=experiment['method'])
+
+
+def test_process_all_experiments_matches_groupby_reference():
+    df_full = make_random_report()
+    experiments = [
+        {'instrument': 'i', 'method': 'A1-A2', 'file_tags': ['E178_A1', 'E178_A2']},
+        {'instrument': 'i', 'method': 'A2-A4', 'file_tags': ['E178_A2', 'E178_A3', 'E178_A4']},  # shares A2
+        {'instrument': 'i', 'method': 'none', 'file_tags': ['E178_Z9']},
+    ]
+
+    results = cf.process_all_experiments(df_full, experiments, protease='lysc', max_missed_cleavages=3)
+
+    for experiment, result in zip(experiments[:2], results[:2]):
+        expected = reference_experiment(df_full, experiment, 'lysc', 3, 3)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert (results[0]['MC3'] > 0).any()
+    assert 0 < results[0]['PG20'].iloc[0] < results[0]['total_protein_groups'].iloc[0]
+
+    # No matching rows: empty, with the same columns and dtypes as the others
+    # (also when processed on its own, where every group array is empty)
+    alone = cf.process_experiment(df_full, experiments[2], protease='lysc', max_missed_cleavages=3)
+    for empty in [results[2], alone]:
+        assert empty.empty
+        pd.testing.assert_series_equal(empty.dtypes, results[0].dtypes)
+
+
+def test_process_all_experiments_n_jobs_matches_serial():
+    df_full = make_random_report(seed=1)
+    experiments = [
+        {'instrument': 'i', 'method': 'A1-A3', 'file_tags': ['E178_A1', 'E178_A2', 'E178_A3']},
+        {'instrument': 'i', 'method': 'none', 'file_tags': ['E178_Z9']},
+        {'instrument': 'i', 'method': 'A3-A6', 'file_tags': ['E178_A3', 'E178_A4', 'E178_A5', 'E178_A6']},
+    ]
+
+    serial = cf.process_all_experiments(df_full, experiments, n_jobs=1)
+    for n_jobs in [2, -1]:
+        threaded = cf.process_all_experiments(df_full, experiments, n_jobs=n_jobs)
+        assert len(threaded) == len(serial)
+        for expected, result in zip(serial, threaded):
+            assert result.equals(expected)
+            pd.testing.assert_series_equal(result.dtypes, expected.dtypes)